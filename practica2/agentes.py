@@ -7,10 +7,18 @@ import threading
 import time
 import random
 import uuid
+import heapq
+import itertools
+from collections import defaultdict, deque
+
+from colmena import fijar_nucleos
 
 class Abeja(threading.Thread):
     """Clase base para todos los tipos de abejas"""
-    
+
+    # True si trabajar() ya espera el tiempo del ciclo (no hace falta pausa extra)
+    espera_propia = False
+
     def __init__(self, colmena, id_abeja=None, tiempo_vida=60, 
                  tiempo_trabajo=0.5, rol="genérica"):
         """
@@ -25,57 +33,101 @@ class Abeja(threading.Thread):
         """
         super().__init__()
         self.colmena = colmena
+        self.rol_inicial = rol
+        self.daemon = True  # Termina cuando el hilo principal acaba
+        self.reiniciar(id_abeja=id_abeja, tiempo_vida=tiempo_vida,
+                       tiempo_trabajo=tiempo_trabajo)
+    
+    def reiniciar(self, id_abeja=None, tiempo_vida=60, tiempo_trabajo=0.5):
+        """
+        Deja la abeja como recién nacida: al crearla y al reutilizarla
+        desde una ReservaAbejas (los subtipos reinician también su estado)
+        """
         self.id_abeja = id_abeja or str(uuid.uuid4())[:8]
         self.tiempo_vida = tiempo_vida
         self.tiempo_trabajo = tiempo_trabajo
-        self.rol = rol
-        self.daemon = True  # Termina cuando el hilo principal acaba
+        self.rol = self.rol_inicial
         self.activa = True
+        self.tiempo_inicio = None  # Se fija al empezar a trabajar
         self.colmena.registrar_abeja(self.id_abeja, self.rol)
         
-        # Para identificación completa de la abeja
-        self.nombre_completo = f"{self.rol}_{self.id_abeja}"
+        # Mensaje de muerte preparado de antemano (solo cambia el rol)
+        self._mensaje_muerte = {"tipo": "muerte", "rol": None, "id": self.id_abeja}
+    
+    @property
+    def nombre_completo(self):
+        """Identificación completa de la abeja (se construye solo al pedirla)"""
+        return f"{self.rol}_{self.id_abeja}"
     
     def run(self):
         """Ciclo de vida base para cualquier abeja"""
-        tiempo_inicio = time.time()
+        self.tiempo_inicio = self.colmena.reloj()
+        fijar_nucleos(eventos=False)
+        
+        # Retraso inicial aleatorio para que las abejas no despierten todas a la vez
+        self.colmena.esperar_fin_simulacion(random.uniform(0, self.tiempo_trabajo))
         
         try:
-            while (time.time() - tiempo_inicio < self.tiempo_vida and 
-                   self.activa and 
-                   not self.colmena.event_fin_simulacion.is_set()):
+            while self.sigue_viva():
                 
                 # Verificar si hay que trabajar (depende del día/noche)
-                if not self.colmena.event_dia.is_set() and self.rol != "defensora":
-                    # Las abejas excepto defensoras descansan en la noche
-                    time.sleep(1)
+                if self.descansa():
+                    # Despertar en cuanto se haga de día
+                    self.colmena.event_dia.wait(timeout=min(self.tiempo_restante(), 1.0))
                     continue
-                
+
                 # Ejecutar la tarea específica según rol
                 self.trabajar()
-                
-                # Tiempo entre ciclos de trabajo
-                time.sleep(self.tiempo_trabajo)
+
+                # Tiempo entre ciclos de trabajo (se interrumpe al terminar la simulación)
+                pausa = self.pausa_hilo()
+                if pausa and self.colmena.esperar_fin_simulacion(pausa):
+                    break
         except Exception as e:
             print(f"Error en {self.nombre_completo}: {e}")
         finally:
-            # Informar a la reina antes de morir (para posible reemplazo)
-            if not self.colmena.event_fin_simulacion.is_set():
-                self.colmena.enviar_mensaje_reina({
-                    "tipo": "muerte", 
-                    "rol": self.rol,
-                    "id": self.id_abeja
-                })
+            self.terminar()
+    
+    def tiempo_restante(self):
+        """Segundos de vida que le quedan a la abeja"""
+        return self.tiempo_vida - (self.colmena.reloj() - self.tiempo_inicio)
+    
+    def sigue_viva(self):
+        """Indica si la abeja debe seguir con su ciclo de vida"""
+        return (self.tiempo_restante() > 0 and
+                self.activa and
+                not self.colmena.simulacion_terminada())
+    
+    def descansa(self):
+        """Las abejas excepto defensoras descansan en la noche"""
+        return not self.colmena.event_dia.is_set() and self.rol != "defensora"
+    
+    def terminar(self):
+        """Tareas al final de la vida de la abeja"""
+        # Informar a la reina antes de morir (para posible reemplazo)
+        if not self.colmena.simulacion_terminada():
+            self._mensaje_muerte["rol"] = self.rol
+            self.colmena.enviar_mensaje_reina(self._mensaje_muerte)
     
     def trabajar(self):
         """Método a sobrescribir por cada tipo específico de abeja"""
         pass
     
+    def espera_ciclo(self):
+        """Segundos entre ciclos de trabajo cuando la planifica un PlanificadorAbejas"""
+        return self.tiempo_trabajo
+    
+    def pausa_hilo(self):
+        """
+        Segundos de pausa entre ciclos cuando tiene su propio hilo: ninguna si
+        su trabajar() ya espera (espera_propia)
+        """
+        return 0 if self.espera_propia else self.tiempo_trabajo
+    
     def cambiar_rol(self, nuevo_rol):
         """Cambia el rol de la abeja si es necesario"""
         rol_anterior = self.rol
         self.rol = nuevo_rol
-        self.nombre_completo = f"{self.rol}_{self.id_abeja}"
         self.colmena.cambiar_rol_abeja(rol_anterior, nuevo_rol)
         return True
     
@@ -86,28 +138,62 @@ class Abeja(threading.Thread):
 class Recolectora(Abeja):
     """Abeja que viaja a flores y recolecta néctar/polen"""
     
-    def __init__(self, colmena, **kwargs):
+    def __init__(self, colmena, umbral_entrega=None, **kwargs):
+        """
+        Inicializa una recolectora que acumula polen antes de entregarlo
+        
+        Args:
+            umbral_entrega: Polen acumulado a partir del cual se lleva a la
+                colmena (por defecto, la capacidad de polen de la colmena)
+        """
         super().__init__(colmena, rol="recolectora", **kwargs)
+        self.umbral_entrega = umbral_entrega or colmena.capacidad_polen
+        self.ciclos_max_entrega = 5  # Entrega aunque no llegue al umbral
+    
+    def reiniciar(self, **kwargs):
+        super().reiniciar(**kwargs)
+        self.polen_acumulado = 0
+        self.ciclos_acumulando = 0
+    
+    def terminar(self):
+        # No perder el polen que llevaba encima al morir
+        self.entregar_polen()
+        super().terminar()
+    
+    def entregar_polen(self):
+        """Lleva a la colmena todo el polen acumulado como un único envío"""
+        if self.polen_acumulado > 0:
+            self.colmena.agregar_nectar_cola(self.polen_acumulado, self.id_abeja)
+        self.polen_acumulado = 0
+        self.ciclos_acumulando = 0
     
     def trabajar(self):
         # Visitar flor y recolectar polen/néctar
-        polen = self.colmena.visitar_flor(self.id_abeja)
+        self.polen_acumulado += self.colmena.visitar_flor(self.id_abeja)
+        self.ciclos_acumulando += 1
         
-        if polen > 0:
-            # Llevar a la colmena y poner en la cola
-            self.colmena.agregar_nectar_cola(polen, self.id_abeja)
+        # Llevar a la colmena cuando va cargada o tras varios viajes
+        if (self.polen_acumulado >= self.umbral_entrega or
+                self.ciclos_acumulando >= self.ciclos_max_entrega):
+            self.entregar_polen()
 
 
 class Almacenadora(Abeja):
     """Abeja que traslada el néctar de la cola a las celdas"""
-    
+
+    # La espera bloqueante en la cola marca el ritmo del ciclo
+    espera_propia = True
+
     def __init__(self, colmena, **kwargs):
         super().__init__(colmena, rol="almacenadora", **kwargs)
+    
+    def reiniciar(self, **kwargs):
+        super().reiniciar(**kwargs)
         self.intentos_vacios = 0
     
     def trabajar(self):
-        # Intentar obtener néctar de la cola
-        resultado = self.colmena.obtener_nectar_cola()
+        # Esperar néctar en la cola (despierta en cuanto una recolectora lo deja)
+        resultado = self.colmena.obtener_nectar_cola(timeout=self.tiempo_trabajo)
         
         if resultado:
             cantidad, id_origen = resultado
@@ -134,6 +220,9 @@ class Nodriza(Abeja):
     
     def __init__(self, colmena, **kwargs):
         super().__init__(colmena, rol="nodriza", **kwargs)
+    
+    def reiniciar(self, **kwargs):
+        super().reiniciar(**kwargs)
         self.intentos_sin_alimento = 0
     
     def trabajar(self):
@@ -156,33 +245,58 @@ class Nodriza(Abeja):
 
 class Defensora(Abeja):
     """Abeja que protege la colmena de amenazas externas"""
-    
+
+    # La espera de un ataque que reclamar marca el ritmo de la patrulla
+    espera_propia = True
+
     def __init__(self, colmena, **kwargs):
         super().__init__(colmena, rol="defensora", **kwargs)
         self.tiempo_patrulla = 0.2  # Patrulla más rápido que otras tareas
+        self.tiempo_respuesta = 0.3  # Desde que reclama un ataque hasta neutralizarlo
+    
+    def reiniciar(self, **kwargs):
+        super().reiniciar(**kwargs)
+        self.ataque_reclamado = False
     
     def trabajar(self):
-        # Verificar si hay algún ataque
-        if self.colmena.event_ataque.is_set():
-            # Defender la colmena
-            time.sleep(0.3)  # Tiempo de respuesta al ataque
+        if self.ataque_reclamado:
+            # Pasado el tiempo de respuesta, el ataque reclamado queda neutralizado
+            self.ataque_reclamado = False
             self.colmena.neutralizar_ataque(self.id_abeja)
-        else:
-            # Patrullar normalmente (más rápido)
-            time.sleep(self.tiempo_patrulla)
+        elif self.colmena.reclamar_ataque(timeout=self.tiempo_patrulla):
+            # Patrullar esperando un ataque; solo una defensora se hace cargo de cada uno
+            self.ataque_reclamado = True
+    
+    # El tiempo de respuesta es una pausa entre ciclos, así también cuenta en
+    # tiempo virtual (donde las esperas dentro de trabajar() no bloquean)
+    def espera_ciclo(self):
+        return self.tiempo_respuesta if self.ataque_reclamado else self.tiempo_patrulla
+    
+    def pausa_hilo(self):
+        return self.tiempo_respuesta if self.ataque_reclamado else 0
 
 
 class Reina(Abeja):
     """Abeja reina que coordina la colmena y redistribuye roles"""
     
-    def __init__(self, colmena, equilibrio_ideal=None, **kwargs):
+    # La espera adaptativa en el buzón marca el ritmo de la reina
+    espera_propia = True
+    
+    def __init__(self, colmena, equilibrio_ideal=None, planificador=None,
+                 reserva=None, **kwargs):
         """
         Inicializa la reina con su equilibrio ideal
         
         Args:
             equilibrio_ideal: Diccionario con % ideal de cada rol
+            planificador: PlanificadorAbejas donde lanzar las abejas que lo
+                admiten (si no se indica, cada abeja tiene su propio hilo)
+            reserva: ReservaAbejas de donde sacar las abejas nuevas y a la que
+                devolver las muertas (si no se indica, se crean siempre nuevas)
         """
         super().__init__(colmena, rol="reina", **kwargs)
+        self.planificador = planificador
+        self.reserva = reserva
         
         # Equilibrio ideal por defecto si no se proporciona
         self.equilibrio_ideal = equilibrio_ideal or {
@@ -200,19 +314,66 @@ class Reina(Abeja):
             "defensora": Defensora
         }
         
-        # Registro de abejas activas por ID
+        # Registro de abejas activas por ID, e índice de IDs por rol
         self.abejas_activas = {}
+        self.ids_por_rol = {}
+
+        # Ciclos seguidos sin mensajes (alarga la espera en el buzón)
+        self.ciclos_sin_mensajes = 0
+        
+        # Revisiones periódicas por tiempo (según colmena.reloj()), no por ciclo:
+        # de media, el mismo ritmo que el antiguo 20% / 10% por ciclo de 0.5 s
+        self.intervalo_reasignacion = 2.5
+        self.intervalo_metricas = 5.0
+        self.proxima_reasignacion = 0.0
+        self.proximas_metricas = 0.0
     
     def agregar_abeja(self, abeja):
         """Registra una nueva abeja en la colonia"""
         self.abejas_activas[abeja.id_abeja] = abeja
+        self.ids_por_rol.setdefault(abeja.rol, set()).add(abeja.id_abeja)
+    
+    def quitar_abeja(self, id_abeja):
+        """Elimina una abeja del registro de la colonia"""
+        abeja = self.abejas_activas.pop(id_abeja, None)
+        if abeja:
+            self.ids_por_rol.get(abeja.rol, set()).discard(id_abeja)
+            # Las que vivieron en el planificador (ident None: su hilo nunca
+            # arrancó) pueden reutilizarse; un hilo no puede volver a arrancar
+            if self.reserva and abeja.ident is None:
+                self.reserva.liberar(abeja)
+    
+    def reasignar_abeja(self, abeja, nuevo_rol):
+        """Cambia el rol de una abeja manteniendo al día el índice por rol"""
+        self.ids_por_rol.get(abeja.rol, set()).discard(abeja.id_abeja)
+        abeja.cambiar_rol(nuevo_rol)
+        self.ids_por_rol.setdefault(nuevo_rol, set()).add(abeja.id_abeja)
+    
+    def lanzar_abeja(self, abeja):
+        """
+        Registra una abeja y la pone a trabajar: en el planificador si su
+        trabajo no bloquea, o en su propio hilo si no
+        """
+        self.agregar_abeja(abeja)
+        if self.planificador and self.planificador.admite(abeja):
+            self.planificador.agregar(abeja)
+        else:
+            abeja.start()
+    
+    def esperar_abejas(self, timeout=None):
+        """Espera a que terminen las abejas activas que tienen hilo propio"""
+        for abeja in list(self.abejas_activas.values()):
+            if abeja.ident is not None:
+                abeja.join(timeout)
     
     def crear_abeja(self, rol):
         """Crea una nueva abeja del rol especificado"""
         if rol in self.fabrica_abejas:
-            nueva_abeja = self.fabrica_abejas[rol](self.colmena)
-            self.agregar_abeja(nueva_abeja)
-            nueva_abeja.start()
+            if self.reserva:
+                nueva_abeja = self.reserva.adquirir(rol)
+            else:
+                nueva_abeja = self.fabrica_abejas[rol](self.colmena)
+            self.lanzar_abeja(nueva_abeja)
             return nueva_abeja
         return None
     
@@ -267,12 +428,12 @@ class Reina(Abeja):
         rol_excedente, rol_deficiente = self.identificar_desequilibrio()
         
         if rol_excedente and rol_deficiente:
-            # Buscar una abeja del rol excedente para cambiar
-            for id_abeja, abeja in self.abejas_activas.items():
-                if abeja.rol == rol_excedente:
-                    # Cambiar el rol de esta abeja
-                    abeja.cambiar_rol(rol_deficiente)
-                    return True
+            # Tomar cualquier abeja del rol excedente (sin recorrer la colonia)
+            id_abeja = next(iter(self.ids_por_rol.get(rol_excedente, ())), None)
+            if id_abeja is not None:
+                # Cambiar el rol de esta abeja
+                self.reasignar_abeja(self.abejas_activas[id_abeja], rol_deficiente)
+                return True
         
         return False
     
@@ -287,17 +448,16 @@ class Reina(Abeja):
         
         if tipo == "muerte":
             # Una abeja ha muerto, eliminar y reemplazar
-            if id_abeja in self.abejas_activas:
-                del self.abejas_activas[id_abeja]
+            self.quitar_abeja(id_abeja)
             self.reemplazar_abeja_muerta(rol)
         
         elif tipo == "inactiva" and rol == "almacenadora":
             # Almacenadoras sin trabajo, posible conversión a recolectoras
-            if self.colmena.contador_global["nectar_recolectado"] > 0:
+            if self.colmena.contador_global["nectar_recolectado"].valor > 0:
                 # Solo cambiar si ya hay producción (no al inicio)
                 abeja = self.abejas_activas.get(id_abeja)
                 if abeja:
-                    abeja.cambiar_rol("recolectora")
+                    self.reasignar_abeja(abeja, "recolectora")
         
         elif tipo == "falta_alimento" and rol == "nodriza":
             # Falta néctar para alimentar larvas, necesitamos más recolectoras
@@ -305,17 +465,230 @@ class Reina(Abeja):
                 "tipo": "necesidad_nectar"
             })
     
+    def timeout_buzon(self):
+        """
+        Espera adaptativa en el buzón: corta tras recibir mensajes y
+        progresivamente más larga mientras la colmena está en calma
+        """
+        if self.ciclos_sin_mensajes < 10:
+            return 0.01
+        if self.ciclos_sin_mensajes < 100:
+            return 0.1
+        return 1.0
+    
     def trabajar(self):
         """Monitorea la colmena y realiza ajustes según sea necesario"""
         # Procesar mensajes de las abejas
-        mensaje = self.colmena.obtener_mensaje_reina(timeout=0.1)
+        mensaje = self.colmena.obtener_mensaje_reina(timeout=self.timeout_buzon())
         if mensaje:
-            self.procesar_mensaje(mensaje)
+            self.ciclos_sin_mensajes = 0
+            # Atender toda la ráfaga de mensajes pendientes en este ciclo
+            while mensaje:
+                self.procesar_mensaje(mensaje)
+                mensaje = self.colmena.obtener_mensaje_reina(timeout=0)
+        else:
+            self.ciclos_sin_mensajes += 1
+        
+        ahora = self.colmena.reloj()
         
         # Periódicamente revisar equilibrio y reasignar roles
-        if random.random() < 0.2:  # 20% de probabilidad cada ciclo
+        if ahora >= self.proxima_reasignacion:
+            self.proxima_reasignacion = ahora + self.intervalo_reasignacion
             self.reasignar_roles()
         
         # Recolectar métricas periódicamente
-        if random.random() < 0.1:  # 10% de probabilidad
-            metricas = self.colmena.obtener_metricas()
\ No newline at end of file
+        if ahora >= self.proximas_metricas:
+            self.proximas_metricas = ahora + self.intervalo_metricas
+            metricas = self.colmena.obtener_metricas()
+    
+    def espera_ciclo(self):
+        return self.timeout_buzon()
+
+
+class PlanificadorAbejas:
+    """
+    Ejecuta muchas abejas con unos pocos hilos de trabajo
+    Guarda en un montículo (heapq) las abejas ordenadas por su próximo
+    despertar; cada hilo saca la más urgente, ejecuta un ciclo de trabajo y
+    la vuelve a planificar. Solo admite abejas cuyo trabajar() no bloquea
+    (espera_propia = False)
+    En tiempo virtual no usa hilos: programa cada ciclo en el planificador
+    de eventos, que lo ejecuta todo en un solo hilo (y admite cualquier abeja)
+    """
+    
+    def __init__(self, colmena, num_hilos=4, eventos=None):
+        """
+        Inicializa el planificador
+        
+        Args:
+            colmena: Referencia a la colmena compartida
+            num_hilos: Número de hilos que ejecutan los ciclos de las abejas
+            eventos: PlanificadorEventos en tiempo virtual donde programar los
+                ciclos (si no se indica, se ejecutan en tiempo real con hilos)
+        """
+        self.colmena = colmena
+        self.eventos = eventos
+        self.monticulo = []  # (próximo_despertar, orden, abeja)
+        self.pendientes = set()  # En tiempo virtual: abejas con un ciclo programado
+        self.orden = itertools.count()  # Desempate entre abejas con la misma hora
+        self.cond = threading.Condition()
+        self.hilos = [] if eventos else [
+            threading.Thread(target=self._ejecutar, name=f"Planificador-{i}")
+            for i in range(num_hilos)
+        ]
+        if eventos:
+            eventos.al_terminar(self.despedir_restantes)
+        else:
+            colmena.al_finalizar(self.detener)
+    
+    def iniciar(self):
+        """Arranca los hilos de trabajo"""
+        for hilo in self.hilos:
+            hilo.start()
+    
+    def detener(self):
+        """Despierta a los hilos de trabajo para que vean el fin de la simulación"""
+        with self.cond:
+            self.cond.notify_all()
+    
+    def esperar(self, timeout=None):
+        """Espera a que los hilos de trabajo salgan tras el fin de la simulación"""
+        for hilo in self.hilos:
+            hilo.join(timeout)
+    
+    def agregar(self, abeja):
+        """
+        Empieza la vida de una abeja dentro del planificador, con un retraso
+        inicial aleatorio para repartir los despertares en el tiempo
+        """
+        abeja.tiempo_inicio = self.colmena.reloj()
+        self.planificar(abeja, random.uniform(0, abeja.tiempo_trabajo))
+    
+    def admite(self, abeja):
+        """Indica si la abeja puede vivir en el planificador"""
+        return self.eventos is not None or not abeja.espera_propia
+    
+    def planificar(self, abeja, retraso):
+        """Programa el próximo ciclo de una abeja dentro de retraso segundos"""
+        if self.eventos:
+            self.pendientes.add(abeja)
+            self.eventos.programar(retraso, lambda: self._ciclo_pendiente(abeja))
+            return
+        with self.cond:
+            if not self.colmena.simulacion_terminada():
+                heapq.heappush(self.monticulo,
+                               (time.monotonic() + retraso, next(self.orden), abeja))
+                self.cond.notify()
+                return
+        # La simulación ya ha terminado: la abeja no vuelve al montículo
+        abeja.terminar()
+    
+    def despedir_restantes(self):
+        """
+        Termina las abejas que seguían planificadas al acabar la simulación
+        (así las recolectoras entregan el polen que aún llevan)
+        """
+        with self.cond:
+            restantes = [abeja for _, _, abeja in self.monticulo]
+            restantes.extend(self.pendientes)
+            self.monticulo.clear()
+            self.pendientes.clear()
+        for abeja in restantes:
+            abeja.terminar()
+    
+    def _siguiente(self):
+        """
+        Espera a que venza el ciclo de la abeja más urgente
+        Devuelve: la abeja o None si la simulación ha terminado
+        """
+        with self.cond:
+            while not self.colmena.simulacion_terminada():
+                # Sin abejas, hasta que llegue una; el fin lo avisa detener()
+                espera = None
+                if self.monticulo:
+                    espera = self.monticulo[0][0] - time.monotonic()
+                    if espera <= 0:
+                        return heapq.heappop(self.monticulo)[2]
+                self.cond.wait(espera)
+            return None
+    
+    def _ejecutar(self):
+        """Bucle de cada hilo de trabajo"""
+        fijar_nucleos(eventos=False)
+        while True:
+            abeja = self._siguiente()
+            if abeja is None:
+                self.despedir_restantes()
+                return
+            self._ciclo(abeja)
+    
+    def _ciclo_pendiente(self, abeja):
+        """Ciclo programado en tiempo virtual"""
+        self.pendientes.discard(abeja)
+        self._ciclo(abeja)
+    
+    def _ciclo(self, abeja):
+        """Ejecuta un ciclo de vida de la abeja y la vuelve a planificar"""
+        try:
+            if not abeja.sigue_viva():
+                abeja.terminar()
+                return
+            
+            if abeja.descansa():
+                self.planificar(abeja, min(abeja.tiempo_restante(), 1.0))
+                return
+            
+            abeja.trabajar()
+        except Exception as e:
+            print(f"Error en {abeja.nombre_completo}: {e}")
+            abeja.terminar()
+            return
+        
+        self.planificar(abeja, abeja.espera_ciclo())
+
+
+class ReservaAbejas:
+    """
+    Reserva de abejas muertas para reutilizarlas en lugar de crear objetos nuevos
+    Guarda las abejas libres por clase en un deque, hasta max_por_clase
+    """
+    
+    def __init__(self, colmena, fabrica, max_por_clase=32):
+        """
+        Inicializa la reserva
+        
+        Args:
+            colmena: Referencia a la colmena compartida
+            fabrica: Diccionario rol -> clase de abeja
+            max_por_clase: Máximo de abejas libres guardadas por clase
+        """
+        self.colmena = colmena
+        self.fabrica = fabrica
+        self.max_por_clase = max_por_clase
+        self.disponibles = defaultdict(deque)
+        self.lock = threading.Lock()
+    
+    def adquirir(self, rol, **kwargs):
+        """
+        Devuelve una abeja del rol indicado, reutilizada si hay alguna libre
+        
+        Args:
+            rol: Rol de la abeja
+            kwargs: Parámetros de Abeja (id_abeja, tiempo_vida, tiempo_trabajo)
+        """
+        clase = self.fabrica[rol]
+        with self.lock:
+            libres = self.disponibles[clase]
+            abeja = libres.popleft() if libres else None
+        
+        if abeja is None:
+            return clase(self.colmena, **kwargs)
+        abeja.reiniciar(**kwargs)
+        return abeja
+    
+    def liberar(self, abeja):
+        """Devuelve a la reserva una abeja que ha terminado su vida"""
+        with self.lock:
+            libres = self.disponibles[type(abeja)]
+            if len(libres) < self.max_por_clase:
+                libres.append(abeja)
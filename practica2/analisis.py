@@ -4,43 +4,136 @@ import threading
 import json
 import os
 
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json
+    orjson = None
+
+try:
+    from numba import njit
+except ImportError:  # numba es opcional: sin él se usa la versión NumPy
+    njit = None
+
+# Columnas del historial de métricas, en orden
+COLUMNAS_METRICAS = (
+    "nectar_recolectado",
+    "nectar_almacenado",
+    "ataques_detectados",
+    "ataques_neutralizados",
+    "cambios_rol",
+    "flores_visitadas",
+    "larvas_alimentadas",
+    "celdas_ocupadas",
+    "celdas_libres"
+)
+
+# Roles registrados en el historial, en orden
+ROLES = ("recolectora", "almacenadora", "nodriza", "defensora", "reina")
+
+# Muestras que caben en el historial circular
+MAX_REGISTROS = 4096
+
+
+def _medias_roles_numpy(historial_roles, num_registros):
+    """Media de abejas por rol en las muestras válidas (vectorizada con NumPy)"""
+    return historial_roles[:num_registros].mean(axis=0)
+
+
+def _medias_roles_bucles(historial_roles, num_registros):
+    """Media de abejas por rol con bucles explícitos, para compilar con numba"""
+    medias = np.zeros(historial_roles.shape[1])
+    for i in range(num_registros):
+        for j in range(historial_roles.shape[1]):
+            medias[j] += historial_roles[i, j]
+    return medias / num_registros
+
+
+if njit is not None:
+    medias_roles = njit(cache=True)(_medias_roles_bucles)
+else:
+    medias_roles = _medias_roles_numpy
+
 
 class Analizador:
-    def __init__(self, colmena, intervalo=5):
+    def __init__(self, colmena, intervalo=5, max_registros=MAX_REGISTROS):
         self.colmena = colmena
         self.intervalo = intervalo
-        self.historial_metricas = []
-        self.historial_roles = []
-        self.hora_inicio = time.time()
+        # Historial circular preasignado: una fila por muestra
+        self.historial_metricas = np.zeros(
+            (max_registros, len(COLUMNAS_METRICAS)), dtype=np.int64
+        )
+        self.historial_tiempos = np.zeros(max_registros, dtype=np.float64)
+        self.historial_roles = np.zeros((max_registros, len(ROLES)), dtype=np.int32)
+        self._indice = 0
+        self._num_registros = 0
+        self._lock_historial = threading.Lock()
+        # Última estadística calculada; se invalida al añadir una muestra
+        self._estadisticas_cache = None
+        self._estadisticas_sucias = True
+        self._version_historial = 0  # Aumenta con cada muestra añadida
+        self.hora_inicio = colmena.reloj()
         self.eficiencia_roles = defaultdict(float)
         self.thread_recopilacion = threading.Thread(
-            target=self._recopilar_periodicamente,
-            daemon=True
+            target=self._recopilar_periodicamente
         )
 
-    def iniciar(self):
-        self.thread_recopilacion.start()
+    def iniciar(self, planificador=None):
+        # En tiempo virtual las muestras se programan en el planificador de eventos
+        if planificador:
+            self._recopilar_programado(planificador)
+        else:
+            self.thread_recopilacion.start()
         print("[Análisis] Iniciado sistema de monitoreo de la colmena")
 
     def _recopilar_periodicamente(self):
-        while not self.colmena.event_fin_simulacion.is_set():
-            metricas = self.colmena.obtener_metricas()
-            distribucion = self.colmena.obtener_distribucion_roles()
-            tiempo_actual = time.time() - self.hora_inicio
-            metricas["tiempo"] = tiempo_actual
-            self.historial_metricas.append(metricas.copy())
-            self.historial_roles.append({
-                "tiempo": tiempo_actual,
-                "roles": distribucion.copy()
-            })
-            time.sleep(self.intervalo)
+        while not self.colmena.simulacion_terminada():
+            self._registrar_muestra()
+            self.colmena.esperar_fin_simulacion(self.intervalo)
+
+    def esperar(self, timeout=None):
+        """Espera a que termine el hilo de recopilación, si llegó a arrancar"""
+        if self.thread_recopilacion.ident is not None:
+            self.thread_recopilacion.join(timeout)
+
+    def _recopilar_programado(self, planificador):
+        self._registrar_muestra()
+        planificador.programar(self.intervalo,
+                               lambda: self._recopilar_programado(planificador))
+
+    def _registrar_muestra(self):
+        metricas = self.colmena.obtener_metricas()
+        distribucion = self.colmena.obtener_distribucion_roles()
+        tiempo_actual = self.colmena.reloj() - self.hora_inicio
+        fila = [metricas[columna] for columna in COLUMNAS_METRICAS]
+        with self._lock_historial:
+            self.historial_metricas[self._indice] = fila
+            self.historial_tiempos[self._indice] = tiempo_actual
+            self.historial_roles[self._indice] = [
+                distribucion.get(rol, 0) for rol in ROLES
+            ]
+            self._indice = (self._indice + 1) % len(self.historial_metricas)
+            self._num_registros = min(self._num_registros + 1,
+                                      len(self.historial_metricas))
+            self._version_historial += 1
+            self._estadisticas_sucias = True
 
     def calcular_estadisticas(self):
-        if not self.historial_metricas:
-            return {"error": "No hay datos suficientes para análisis"}
+        with self._lock_historial:
+            if not self._estadisticas_sucias and self._estadisticas_cache is not None:
+                return self._estadisticas_cache
+            if self._num_registros == 0:
+                return {"error": "No hay datos suficientes para análisis"}
+            version = self._version_historial
+
+            ultimo = (self._indice - 1) % len(self.historial_metricas)
+            final = dict(zip(COLUMNAS_METRICAS,
+                             self.historial_metricas[ultimo].tolist()))
+            final["tiempo"] = float(self.historial_tiempos[ultimo])
+            medias = medias_roles(self.historial_roles, self._num_registros)
+            roles_promedio = dict(zip(ROLES, medias.tolist()))
 
-        inicio = self.historial_metricas[0]
-        final = self.historial_metricas[-1]
         tiempo_total = final["tiempo"] / 60
 
         if tiempo_total > 0:
@@ -64,20 +157,6 @@ class Analizador:
         else:
             eficiencia_almacenamiento = 0
 
-        roles_promedio = {}
-        if self.historial_roles:
-            conteo_roles = defaultdict(int)
-            total_registros = len(self.historial_roles)
-
-            for registro in self.historial_roles:
-                for rol, cantidad in registro["roles"].items():
-                    conteo_roles[rol] += cantidad
-
-            roles_promedio = {
-                rol: cantidad / total_registros 
-                for rol, cantidad in conteo_roles.items()
-            }
-
         estadisticas = {
             "tiempo_total_segundos": final["tiempo"],
             "tiempo_total_minutos": tiempo_total,
@@ -107,6 +186,12 @@ class Analizador:
             "roles_promedio": roles_promedio
         }
 
+        # Publicar la caché y limpiar la marca a la vez, y solo si no ha
+        # llegado otra muestra mientras se calculaba
+        with self._lock_historial:
+            if self._version_historial == version:
+                self._estadisticas_cache = estadisticas
+                self._estadisticas_sucias = False
         return estadisticas
 
     def generar_informe(self):
@@ -158,8 +243,12 @@ class Analizador:
     def guardar_informe(self, archivo="informe_colmena.json"):
         informe = self.generar_informe()
         try:
-            with open(archivo, "w", encoding="utf-8") as f:
-                json.dump(informe, f, indent=2, ensure_ascii=False)
+            if orjson is not None:
+                with open(archivo, "wb") as f:
+                    f.write(orjson.dumps(informe, option=orjson.OPT_INDENT_2))
+            else:
+                with open(archivo, "w", encoding="utf-8") as f:
+                    json.dump(informe, f, indent=2, ensure_ascii=False)
             print(f"[Análisis] Informe guardado en {archivo}")
         except Exception as e:
             print(f"[Análisis] Error al guardar informe: {e}")
\ No newline at end of file
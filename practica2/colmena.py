@@ -3,10 +3,133 @@ colmena.py - Contenedor central del estado de la colmena
 Define las estructuras compartidas y mecanismos de sincronización
 """
 
+import os
 import threading
-import queue
 import random
-from collections import defaultdict
+import time
+import itertools
+from collections import defaultdict, deque
+
+# Número de fragmentos para las estadísticas por abeja (potencia de 2)
+NUM_FRAGMENTOS_ESTADISTICAS = 16
+
+# Estados de la simulación
+ESTADO_EN_CURSO = "en_curso"
+ESTADO_FINALIZADA = "finalizada"  # Terminó al cumplirse su duración
+ESTADO_ERROR = "error"  # Se detuvo por un fallo
+
+# Núcleos en los que puede ejecutarse el proceso (afinidad solo disponible en Linux)
+NUCLEOS = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+
+def fijar_nucleos(eventos):
+    """
+    Fija el hilo actual: el de eventos al primer núcleo y las abejas al resto,
+    para que los eventos despierten a su hora aunque las abejas ocupen la CPU
+    Sin afinidad (fuera de Linux) o con un solo núcleo no hace nada
+    """
+    if len(NUCLEOS) < 2:
+        return
+    try:
+        os.sched_setaffinity(0, NUCLEOS[:1] if eventos else NUCLEOS[1:])
+    except OSError:
+        pass
+
+class Contador:
+    """Contador monótono con su propio lock, independiente del resto de métricas"""
+    
+    def __init__(self):
+        self._valor = 0
+        self._lock = threading.Lock()
+    
+    def incrementar(self, cantidad=1):
+        """Suma la cantidad indicada al contador"""
+        with self._lock:
+            self._valor += cantidad
+    
+    @property
+    def valor(self):
+        """Valor actual del contador"""
+        with self._lock:
+            return self._valor
+
+
+class ContadorUnEscritor:
+    """
+    Contador sin lock para cuando un solo hilo lo incrementa
+    next() sobre itertools.count es atómico y el valor se publica en un
+    atributo: los lectores leen el último valor sin bloquear al escritor
+    """
+    
+    def __init__(self):
+        self._cuenta = itertools.count(1)
+        self._valor = 0
+    
+    def incrementar(self):
+        """Suma uno al contador (solo desde el hilo escritor)"""
+        self._valor = next(self._cuenta)
+    
+    @property
+    def valor(self):
+        """Último valor publicado"""
+        return self._valor
+
+
+class ColaCondicion:
+    """
+    Cola FIFO sobre collections.deque con una sola Condition para las esperas
+    append/popleft de deque son atómicos, así que extraer sin esperar no bloquea
+    """
+    
+    def __init__(self):
+        self._elementos = deque()
+        self._cond = threading.Condition()
+    
+    def poner(self, elemento):
+        """Añade un elemento y despierta a un consumidor en espera"""
+        with self._cond:
+            self._elementos.append(elemento)
+            self._cond.notify()
+    
+    def obtener(self, timeout=None):
+        """
+        Extrae el primer elemento; si está vacía espera hasta timeout segundos
+        (sin timeout, o con timeout 0, no espera)
+        Devuelve: el elemento o None si no hay
+        """
+        try:
+            return self._elementos.popleft()
+        except IndexError:
+            if not timeout:
+                return None
+        
+        with self._cond:
+            self._cond.wait_for(lambda: self._elementos, timeout)
+            try:
+                return self._elementos.popleft()
+            except IndexError:
+                return None
+
+
+class SemaforoCeldas(threading.BoundedSemaphore):
+    """
+    Semáforo cuyo valor es el número de celdas libres
+    Permite devolver una celda ocupada sin bloquear y consultar la ocupación,
+    de modo que no hace falta un contador y un lock aparte
+    """
+    
+    def liberar_si_ocupada(self):
+        """Libera una celda si hay alguna ocupada. Devuelve True si lo hizo"""
+        with self._cond:
+            if self._value >= self._initial_value:
+                return False
+            self._value += 1
+            self._cond.notify()
+            return True
+    
+    def ocupadas(self):
+        """Número de celdas ocupadas (instantánea sin bloquear)"""
+        return self._initial_value - self._value
+
 
 class Colmena:
     """Clase principal que mantiene el estado compartido de la colmena"""
@@ -26,88 +149,123 @@ class Colmena:
         # Recursos compartidos y capacidades
         self.capacidad_celdas = capacidad_celdas
         self.capacidad_polen = capacidad_polen
-        self.celdas_ocupadas = 0
         
         # Estado de larvas
         self.num_larvas = num_larvas
         self.larvas_alimentadas = 0
         
         # Colas de comunicación
-        self.queue_nectar = queue.Queue()  # Cola entre recolectoras y almacenadoras
+        self.queue_nectar = ColaCondicion()  # Cola entre recolectoras y almacenadoras
         
-        # Contadores para métricas
+        # Contadores para métricas (cada uno con su propio lock, salvo los
+        # de un solo escritor: ataques los registra el hilo de eventos y los
+        # cambios de rol solo los hace la reina)
         self.contador_global = {
-            "nectar_recolectado": 0,
-            "nectar_almacenado": 0,
-            "ataques_detectados": 0,
-            "ataques_neutralizados": 0,
-            "cambios_rol": 0,
-            "flores_visitadas": 0,
-            "larvas_alimentadas": 0
+            "nectar_recolectado": Contador(),
+            "nectar_almacenado": Contador(),
+            "ataques_detectados": ContadorUnEscritor(),
+            "ataques_neutralizados": Contador(),
+            "cambios_rol": ContadorUnEscritor(),
+            "flores_visitadas": Contador(),
+            "larvas_alimentadas": Contador()
         }
         
-        # Estadísticas por abeja
-        self.estadisticas_abejas = defaultdict(lambda: defaultdict(int))
+        # Estadísticas por abeja, repartidas en fragmentos con su propio lock
+        # (según el hash del id) para que las abejas no compitan por uno solo
+        self._fragmentos_estadisticas = [
+            (threading.Lock(), defaultdict(lambda: defaultdict(int)))
+            for _ in range(NUM_FRAGMENTOS_ESTADISTICAS)
+        ]
         
         # Mecanismos de sincronización
-        self.semaforo_celdas = threading.Semaphore(capacidad_celdas)  # Control de acceso a celdas
-        self.lock_celdas = threading.Lock()  # Para actualizar estado de celdas ocupadas
+        self.semaforo_celdas = SemaforoCeldas(capacidad_celdas)  # Celdas libres
         self.lock_larvas = threading.Lock()  # Exclusión mutua para alimentar larvas
-        self.lock_estadisticas = threading.Lock()  # Para actualizar estadísticas
+        
+        # Ataques: cada ataque pendiente lo reclama una sola defensora
+        self.cond_ataque = threading.Condition()
+        self.ataques_pendientes = 0  # Registrados y aún sin defensora
+        self.ataques_activos = 0  # Registrados y aún sin neutralizar
+        self.hora_ultima_neutralizacion = 0.0  # Según self.reloj()
+        
+        # Reloj de la simulación: tiempo real salvo que se pase a tiempo virtual
+        self.reloj = time.monotonic
+        self.tiempo_virtual = False
         
         # Eventos
-        self.event_ataque = threading.Event()  # Señal de ataque
         self.event_dia = threading.Event()  # Señal de día (True) o noche (False)
         self.event_dia.set()  # Empezamos en el día
         self.event_lluvia = threading.Event()  # Señal de lluvia
-        self.event_fin_simulacion = threading.Event()  # Señal para terminar
+        
+        # Estado de la simulación; la condición avisa a quien espera su fin
+        self.cond_estado = threading.Condition()
+        self.estado_simulacion = ESTADO_EN_CURSO
+        self._avisos_fin = []  # Funciones a llamar al terminar (ver al_finalizar)
         
         # Condiciones ambientales
         self.calidad_flores = 1.0  # Multiplicador de calidad de flores (afectado por clima)
-        self.lock_calidad_flores = threading.Lock()
+        self._calidad_q8 = 256  # calidad_flores en punto fijo (x256) para visitar_flor
         
         # Registro de abejas activas por rol
-        self.abejas_por_rol = defaultdict(int)
-        self.lock_roles = threading.Lock()
+        # Es una instantánea inmutable: los escritores (con lock_roles) publican
+        # un dict nuevo y los lectores solo leen el atributo, sin lock
+        self.abejas_por_rol = {
+            "recolectora": 0,
+            "almacenadora": 0,
+            "nodriza": 0,
+            "defensora": 0,
+            "reina": 0
+        }
+        self.lock_roles = threading.Lock()  # Serializa a los escritores
         
         # Cola para mensajes a la reina
-        self.queue_reina = queue.Queue()
+        self.queue_reina = ColaCondicion()
     
     def registrar_abeja(self, id_abeja, rol):
         """Registra una nueva abeja en el contador por rol"""
         with self.lock_roles:
-            self.abejas_por_rol[rol] += 1
+            nuevo = dict(self.abejas_por_rol)
+            nuevo[rol] = nuevo.get(rol, 0) + 1
+            self.abejas_por_rol = nuevo
     
     def cambiar_rol_abeja(self, rol_anterior, rol_nuevo):
         """Actualiza el registro cuando una abeja cambia de rol"""
         with self.lock_roles:
-            self.abejas_por_rol[rol_anterior] -= 1
-            self.abejas_por_rol[rol_nuevo] += 1
-            self.contador_global["cambios_rol"] += 1
+            nuevo = dict(self.abejas_por_rol)
+            nuevo[rol_anterior] = nuevo.get(rol_anterior, 0) - 1
+            nuevo[rol_nuevo] = nuevo.get(rol_nuevo, 0) + 1
+            self.abejas_por_rol = nuevo
+        self.contador_global["cambios_rol"].incrementar()
     
     def obtener_distribucion_roles(self):
-        """Devuelve un diccionario con la cantidad de abejas por rol"""
-        with self.lock_roles:
-            return dict(self.abejas_por_rol)
+        """
+        Devuelve un diccionario con la cantidad de abejas por rol
+        Es la instantánea compartida actual: no debe modificarse
+        """
+        return self.abejas_por_rol
+    
+    def _sumar_estadistica_abeja(self, id_abeja, campo, cantidad=1):
+        """Incrementa una estadística individual bloqueando solo su fragmento"""
+        lock, estadisticas = self._fragmentos_estadisticas[
+            hash(id_abeja) & (NUM_FRAGMENTOS_ESTADISTICAS - 1)
+        ]
+        with lock:
+            estadisticas[id_abeja][campo] += cantidad
     
     def agregar_nectar_cola(self, cantidad, id_abeja):
         """
         Una recolectora añade néctar a la cola para las almacenadoras
         """
-        self.queue_nectar.put((cantidad, id_abeja))
-        with self.lock_estadisticas:
-            self.contador_global["nectar_recolectado"] += cantidad
-            self.estadisticas_abejas[id_abeja]["nectar_recolectado"] += cantidad
+        self.queue_nectar.poner((cantidad, id_abeja))
+        self.contador_global["nectar_recolectado"].incrementar(cantidad)
+        self._sumar_estadistica_abeja(id_abeja, "nectar_recolectado", cantidad)
     
-    def obtener_nectar_cola(self):
+    def obtener_nectar_cola(self, timeout=None):
         """
         Una almacenadora obtiene néctar de la cola para almacenar
+        Si se indica timeout, espera hasta ese tiempo a que llegue néctar
         Devuelve: (cantidad, id_abeja_origen) o None si no hay
         """
-        try:
-            return self.queue_nectar.get(block=False)
-        except queue.Empty:
-            return None
+        return self.queue_nectar.obtener(self._espera(timeout))
     
     def almacenar_nectar(self, cantidad, id_abeja):
         """
@@ -115,12 +273,8 @@ class Colmena:
         Devuelve: True si pudo almacenarse, False si no
         """
         if self.semaforo_celdas.acquire(blocking=False):
-            with self.lock_celdas:
-                self.celdas_ocupadas += 1
-            
-            with self.lock_estadisticas:
-                self.contador_global["nectar_almacenado"] += cantidad
-                self.estadisticas_abejas[id_abeja]["nectar_almacenado"] += cantidad
+            self.contador_global["nectar_almacenado"].incrementar(cantidad)
+            self._sumar_estadistica_abeja(id_abeja, "nectar_almacenado", cantidad)
             
             return True
         return False
@@ -130,14 +284,11 @@ class Colmena:
         Consume néctar de las celdas (para alimentar larvas)
         Devuelve: True si pudo consumirse, False si no hay celdas ocupadas
         """
-        with self.lock_celdas:
-            if self.celdas_ocupadas > 0:
-                self.celdas_ocupadas -= 1
-                self.semaforo_celdas.release()
-                with self.lock_estadisticas:
-                    self.estadisticas_abejas[id_abeja]["nectar_consumido"] += 1
-                return True
+        if not self.semaforo_celdas.liberar_si_ocupada():
             return False
+        
+        self._sumar_estadistica_abeja(id_abeja, "nectar_consumido")
+        return True
     
     def alimentar_larva(self, id_abeja):
         """
@@ -146,13 +297,13 @@ class Colmena:
         """
         if self.consumir_nectar(id_abeja):
             with self.lock_larvas:
-                if self.larvas_alimentadas < self.num_larvas:
-                    self.larvas_alimentadas += 1
-                    with self.lock_estadisticas:
-                        self.contador_global["larvas_alimentadas"] += 1
-                        self.estadisticas_abejas[id_abeja]["larvas_alimentadas"] += 1
-                    return True
-            return False
+                if self.larvas_alimentadas >= self.num_larvas:
+                    return False
+                self.larvas_alimentadas += 1
+            
+            self.contador_global["larvas_alimentadas"].incrementar()
+            self._sumar_estadistica_abeja(id_abeja, "larvas_alimentadas")
+            return True
         return False
     
     def visitar_flor(self, id_abeja):
@@ -163,71 +314,175 @@ class Colmena:
         if not self.event_dia.is_set():  # Es de noche
             return 0  # No se recolecta de noche
         
-        with self.lock_calidad_flores:
-            calidad = self.calidad_flores
+        # Cantidad base entre 1-5, multiplicada por la calidad en punto fijo
+        # (leer un único int no necesita lock)
+        polen_recolectado = (
+            random.randint(1, self.capacidad_polen) * self._calidad_q8
+        ) >> 8
+        if polen_recolectado > self.capacidad_polen:
+            polen_recolectado = self.capacidad_polen
         
-        # Cantidad base entre 1-5, multiplicada por calidad y aleatorizada
-        polen_recolectado = min(
-            round(random.uniform(1, self.capacidad_polen) * calidad),
-            self.capacidad_polen
-        )
+        self.contador_global["flores_visitadas"].incrementar()
+        self._sumar_estadistica_abeja(id_abeja, "flores_visitadas")
         
-        with self.lock_estadisticas:
-            self.contador_global["flores_visitadas"] += 1
-            self.estadisticas_abejas[id_abeja]["flores_visitadas"] += 1
-        
-        return max(0, polen_recolectado)  # Mínimo 0
+        return polen_recolectado
     
     def registrar_ataque(self):
-        """Registra un ataque a la colmena"""
-        self.event_ataque.set()
-        with self.lock_estadisticas:
-            self.contador_global["ataques_detectados"] += 1
+        """Registra un ataque a la colmena y despierta a una sola defensora"""
+        with self.cond_ataque:
+            self.ataques_pendientes += 1
+            self.ataques_activos += 1
+            self.cond_ataque.notify()
+        self.contador_global["ataques_detectados"].incrementar()
+    
+    def reclamar_ataque(self, timeout=None):
+        """
+        Una defensora espera hasta timeout segundos a un ataque sin atender
+        Devuelve: True si se hace cargo de un ataque, False si no hay
+        """
+        with self.cond_ataque:
+            if not self.cond_ataque.wait_for(lambda: self.ataques_pendientes,
+                                             self._espera(timeout)):
+                return False
+            self.ataques_pendientes -= 1
+            return True
+    
+    def ataque_en_curso(self):
+        """Indica si hay algún ataque sin neutralizar"""
+        return self.ataques_activos > 0
     
     def neutralizar_ataque(self, id_abeja):
-        """Una defensora neutraliza un ataque"""
-        self.event_ataque.clear()
-        with self.lock_estadisticas:
-            self.contador_global["ataques_neutralizados"] += 1
-            self.estadisticas_abejas[id_abeja]["ataques_neutralizados"] += 1
+        """
+        Una defensora neutraliza el ataque que había reclamado
+        Devuelve: True si el ataque seguía activo, False si ya se había retirado
+        """
+        with self.cond_ataque:
+            if self.ataques_activos == 0:
+                return False
+            self.ataques_activos -= 1
+            self.hora_ultima_neutralizacion = self.reloj()
+        
+        self.contador_global["ataques_neutralizados"].incrementar()
+        self._sumar_estadistica_abeja(id_abeja, "ataques_neutralizados")
+        return True
+    
+    def cancelar_ataque(self):
+        """El ataque se retira sin haber sido neutralizado a tiempo"""
+        with self.cond_ataque:
+            if self.ataques_activos > 0:
+                self.ataques_activos -= 1
+            if self.ataques_pendientes > self.ataques_activos:
+                self.ataques_pendientes = self.ataques_activos
     
     def cambiar_clima(self, lluvia, calidad_flores):
-        """Actualiza el estado climático y su efecto en las flores"""
-        if lluvia:
-            self.event_lluvia.set()
-        else:
-            self.event_lluvia.clear()
+        """
+        Actualiza el estado climático y su efecto en las flores
+        La calidad se publica sin lock: asignar un atributo es atómico y a
+        las recolectoras les basta con leer el valor de hace un ciclo
+        """
+        # set()/clear() toman el lock interno del Event: solo si cambia de estado
+        if lluvia != self.event_lluvia.is_set():
+            if lluvia:
+                self.event_lluvia.set()
+            else:
+                self.event_lluvia.clear()
         
-        with self.lock_calidad_flores:
-            self.calidad_flores = calidad_flores
+        self.calidad_flores = calidad_flores
+        self._calidad_q8 = int(calidad_flores * 256)
     
     def cambiar_ciclo_dia(self, es_dia):
-        """Cambia entre día y noche"""
-        if es_dia:
-            self.event_dia.set()
-        else:
-            self.event_dia.clear()
+        """Cambia entre día y noche (sin tocar event_dia si ya está en ese estado)"""
+        if es_dia != self.event_dia.is_set():
+            if es_dia:
+                self.event_dia.set()
+            else:
+                self.event_dia.clear()
+    
+    def finalizar_simulacion(self, estado=ESTADO_FINALIZADA):
+        """
+        Señala el fin de la simulación con el motivo indicado
+        Si ya había terminado se conserva el primer motivo
+        """
+        with self.cond_estado:
+            if self.estado_simulacion != ESTADO_EN_CURSO:
+                return
+            self.estado_simulacion = estado
+            self.cond_estado.notify_all()
+        # Fuera del lock: los avisos pueden tomar sus propios locks
+        for aviso in self._avisos_fin:
+            aviso()
+    
+    def al_finalizar(self, aviso):
+        """
+        Registra una función a llamar cuando termine la simulación, para quien
+        espera en su propia condición (si ya terminó, se llama en el momento)
+        """
+        with self.cond_estado:
+            if self.estado_simulacion == ESTADO_EN_CURSO:
+                self._avisos_fin.append(aviso)
+                return
+        aviso()
+    
+    def simulacion_terminada(self):
+        """Indica si la simulación ha terminado (lectura sin lock del estado)"""
+        return self.estado_simulacion != ESTADO_EN_CURSO
+    
+    def esperar_fin_simulacion(self, timeout):
+        """
+        Espera hasta timeout segundos, volviendo en cuanto termine la simulación
+        Devuelve: el estado final si la simulación ha terminado, o None si no
+        """
+        with self.cond_estado:
+            if self.cond_estado.wait_for(self.simulacion_terminada,
+                                         self._espera(timeout)):
+                return self.estado_simulacion
+            return None
+    
+    def usar_tiempo_virtual(self, reloj):
+        """
+        Pasa la colmena a tiempo virtual: la hora la da reloj y las esperas
+        no bloquean, porque en un solo hilo nadie podría cumplirlas mientras tanto
+        Los retrasos que forman parte del modelo (como el tiempo de respuesta
+        de una defensora) se expresan como pausas entre ciclos (espera_ciclo)
+        """
+        self.reloj = reloj
+        self.tiempo_virtual = True
+    
+    def _espera(self, timeout):
+        """Tiempo de espera real para un timeout: ninguno en tiempo virtual"""
+        return 0 if self.tiempo_virtual else timeout
     
     def enviar_mensaje_reina(self, mensaje):
         """Envía un mensaje a la reina a través de la cola"""
-        self.queue_reina.put(mensaje)
+        self.queue_reina.poner(mensaje)
     
     def obtener_mensaje_reina(self, timeout=0.1):
         """Obtiene un mensaje de la cola de la reina"""
-        try:
-            return self.queue_reina.get(block=True, timeout=timeout)
-        except queue.Empty:
-            return None
+        return self.queue_reina.obtener(self._espera(timeout))
+    
+    def celdas_ocupadas(self):
+        """Devuelve el número de celdas ocupadas con néctar"""
+        return self.semaforo_celdas.ocupadas()
     
     def obtener_metricas(self):
-        """Devuelve las métricas globales de la colmena"""
-        with self.lock_estadisticas, self.lock_celdas:
-            metricas = dict(self.contador_global)
-            metricas["celdas_ocupadas"] = self.celdas_ocupadas
-            metricas["celdas_libres"] = self.capacidad_celdas - self.celdas_ocupadas
-            return metricas
+        """
+        Devuelve las métricas globales de la colmena
+        Cada valor se copia tomando solo su propio lock, sin anidar locks
+        """
+        metricas = {
+            nombre: contador.valor
+            for nombre, contador in self.contador_global.items()
+        }
+        ocupadas = self.celdas_ocupadas()
+        metricas["celdas_ocupadas"] = ocupadas
+        metricas["celdas_libres"] = self.capacidad_celdas - ocupadas
+        return metricas
     
     def obtener_estadisticas_abejas(self):
         """Devuelve las estadísticas individuales de cada abeja"""
-        with self.lock_estadisticas:
-            return dict(self.estadisticas_abejas)
\ No newline at end of file
+        estadisticas = {}
+        for lock, fragmento in self._fragmentos_estadisticas:
+            with lock:
+                for id_abeja, valores in fragmento.items():
+                    estadisticas[id_abeja] = dict(valores)
+        return estadisticas
\ No newline at end of file
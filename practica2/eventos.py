@@ -1,190 +1,284 @@
 """
 eventos.py - Simulador de eventos ambientales que afectan a la colmena
-Implementa hilos para generar eventos como clima, ataques y ciclos de día/noche
+Programa en un único hilo eventos como clima, ataques y ciclos de día/noche
 """
 
 import threading
-import time
-import random
+import logging
 import math
+import time
+import heapq
+import itertools
+import numpy as np
+
+from colmena import ESTADO_ERROR, fijar_nucleos
+
+logger = logging.getLogger("colmena.eventos")
+
+TAMANO_LOTE = 1024  # Valores aleatorios generados de una vez por cada LoteAleatorio
+
+# Parámetros del clima
+CLIMA_PROB_LLUVIA = 0.3            # 30% de probabilidad de lluvia
+CLIMA_ESPERA_MIN = 4               # Tiempo mínimo entre cambios climáticos (segundos)
+CLIMA_ESPERA_MAX = 8               # Tiempo máximo entre cambios climáticos (segundos)
+CLIMA_DURACION_LLUVIA_MIN = 2      # Duración mínima de lluvia en segundos
+CLIMA_DURACION_LLUVIA_MAX = 5      # Duración máxima de lluvia en segundos
+CLIMA_CALIDAD_LLUVIA = (0.3, 0.7)  # Calidad de las flores mientras llueve
+CLIMA_CALIDAD_BUENA = (0.8, 1.2)   # Calidad de las flores con buen tiempo
+
+# Parámetros de ataques
+ATAQUE_PROB_BASE = 0.5       # Probabilidad base de ataque
+ATAQUE_FACTOR_DIA = 1.5      # 50% más probable durante el día
+ATAQUE_INTERVALO_MIN = 5     # Tiempo mínimo entre ataques (segundos)
+ATAQUE_INTERVALO_MAX = 8     # Tiempo máximo entre ataques (segundos)
+ATAQUE_ESPERA_INICIAL = 10   # Margen para que la colmena se establezca (segundos)
+ATAQUE_TIMEOUT = 5           # Segundos máximos para neutralizar un ataque
+ATAQUE_TIPOS = ("avispa", "pájaro", "oso", "humano")
+ATAQUE_INTENSIDAD = (1, 10)
+
+# Parámetros del ciclo día/noche
+DURACION_DIA = 8    # Duración del día en segundos
+DURACION_NOCHE = 4  # Duración de la noche en segundos
+
+class LoteAleatorio:
+    """
+    Valores aleatorios generados por lotes con NumPy y servidos de uno en uno
+    Cuando se agota el lote se genera el siguiente con una sola llamada
+    """
+    
+    def __init__(self, generar, tamano=TAMANO_LOTE):
+        """
+        Args:
+            generar: Función que recibe un tamaño y devuelve un array de valores
+            tamano: Número de valores por lote
+        """
+        self._generar = generar
+        self._tamano = tamano
+        self._valores = iter(())
+    
+    def siguiente(self):
+        """Devuelve el siguiente valor del lote (como número de Python)"""
+        try:
+            return next(self._valores)
+        except StopIteration:
+            self._valores = iter(self._generar(self._tamano).tolist())
+            return next(self._valores)
+
+
+class PlanificadorEventos:
+    """
+    Planificador de eventos basado en un montículo (heapq)
+    Guarda las acciones pendientes como (hora, orden, accion) y las ejecuta
+    en orden desde un único hilo; cada acción vuelve a programarse si le hace falta
+    En tiempo virtual no espera: salta directamente a la hora de la siguiente acción
+    """
+    
+    def __init__(self, colmena, virtual=False):
+        self.colmena = colmena
+        self.virtual = virtual
+        self.ahora = 0.0  # Hora virtual actual
+        self.monticulo = []
+        self.orden = itertools.count()  # Desempate entre acciones a la misma hora
+        self.acciones_finales = []  # Se ejecutan una vez, al terminar la simulación
+    
+    def hora(self):
+        """Hora actual del planificador (virtual o time.monotonic())"""
+        return self.ahora if self.virtual else time.monotonic()
+    
+    def programar(self, retraso, accion):
+        """Programa una acción para dentro de retraso segundos"""
+        heapq.heappush(self.monticulo,
+                       (self.hora() + retraso, next(self.orden), accion))
+    
+    def al_terminar(self, accion):
+        """Registra una acción para cuando termine la simulación"""
+        self.acciones_finales.append(accion)
+    
+    def terminar(self):
+        """Ejecuta las acciones registradas con al_terminar"""
+        for accion in self.acciones_finales:
+            accion()
+    
+    def ejecutar(self):
+        """Ejecuta las acciones a su hora hasta que termine la simulación"""
+        while self.monticulo:
+            hora = self.monticulo[0][0]
+            if self.colmena.esperar_fin_simulacion(max(0, hora - self.hora())):
+                break
+            if self.virtual:
+                self.ahora = hora
+            accion = heapq.heappop(self.monticulo)[2]
+            accion()
+
 
 class GestorEventos(threading.Thread):
     """
     Controlador principal que simula eventos externos que afectan a la colmena
     """
     
-    def __init__(self, colmena, tiempo_simulacion=120):
+    def __init__(self, colmena, tiempo_simulacion=120, virtual=False):
         """
         Inicializa el gestor de eventos
         
         Args:
             colmena: Referencia a la colmena compartida
             tiempo_simulacion: Duración total de la simulación en segundos
+            virtual: Simular en tiempo virtual; la colmena pasa a usar el reloj
+                del planificador y run() se llama directamente, sin hilo
         """
         super().__init__()
         self.colmena = colmena
         self.tiempo_simulacion = tiempo_simulacion
-        self.daemon = True  # Termina cuando el hilo principal acaba
         
-        # Crear hilos para diferentes tipos de eventos
-        self.evento_clima = EventoClima(colmena)
-        self.evento_ataque = EventoAtaque(colmena)
-        self.evento_dia_noche = EventoDiaNoche(colmena)
+        # Todos los eventos comparten el planificador de este hilo
+        self.planificador = PlanificadorEventos(colmena, virtual)
+        if virtual:
+            colmena.usar_tiempo_virtual(self.planificador.hora)
     
     def run(self):
         """Ejecuta la simulación por el tiempo especificado"""
-        print("[Eventos] Iniciando simulación de eventos ambientales...")
+        logger.info("[Eventos] Iniciando simulación de eventos ambientales...")
+        if not self.planificador.virtual:
+            fijar_nucleos(eventos=True)
         
-        # Iniciar todos los hilos de eventos
-        self.evento_clima.start()
-        self.evento_ataque.start()
-        self.evento_dia_noche.start()
+        # Programar los primeros eventos y el fin de la simulación
+        for iniciar in EVENTOS:
+            iniciar(self.colmena, self.planificador, self.tiempo_simulacion)
+        self.planificador.programar(self.tiempo_simulacion,
+                                    self.colmena.finalizar_simulacion)
         
-        # Esperar el tiempo total de simulación
-        time.sleep(self.tiempo_simulacion)
+        # Disparar los eventos hasta el fin de la simulación (o hasta que se detenga antes)
+        try:
+            self.planificador.ejecutar()
+        except Exception as e:
+            logger.error("[Eventos] Error en la simulación: %s", e)
+            self.colmena.finalizar_simulacion(ESTADO_ERROR)
         
-        # Señalizar fin de simulación
-        self.colmena.event_fin_simulacion.set()
-        print("[Eventos] Fin de la simulación de eventos ambientales")
+        # Señalizar fin de simulación y cerrar lo que quedó programado
+        self.colmena.finalizar_simulacion()
+        self.planificador.terminar()
+        logger.info("[Eventos] Fin de la simulación de eventos ambientales")
 
 
-class EventoClima(threading.Thread):
-    """Simula cambios en el clima que afectan a la calidad de las flores"""
+def iniciar_clima(colmena, planificador, tiempo_simulacion):
+    """
+    Simula cambios en el clima que afectan a la calidad de las flores
+    Programa el primer cambio; cada cambio programa el siguiente
+    """
+    # Sorteos por lotes con un generador propio (solo lo usa el hilo de eventos)
+    rng = np.random.default_rng()
+    esperas = LoteAleatorio(
+        lambda n: rng.uniform(CLIMA_ESPERA_MIN, CLIMA_ESPERA_MAX, n)).siguiente
+    sorteos_lluvia = LoteAleatorio(rng.random).siguiente
+    calidades_lluvia = LoteAleatorio(
+        lambda n: rng.uniform(*CLIMA_CALIDAD_LLUVIA, n)).siguiente
+    duraciones_lluvia = LoteAleatorio(
+        lambda n: rng.uniform(CLIMA_DURACION_LLUVIA_MIN, CLIMA_DURACION_LLUVIA_MAX, n)
+    ).siguiente
+    calidades_buenas = LoteAleatorio(
+        lambda n: rng.uniform(*CLIMA_CALIDAD_BUENA, n)).siguiente
     
-    def __init__(self, colmena):
-        super().__init__()
-        self.colmena = colmena
-        self.daemon = True
-        
-        # Parámetros del clima
-        self.probabilidad_lluvia = 0.3  # 30% de probabilidad de lluvia
-        self.duracion_min_lluvia = 2    # Duración mínima de lluvia en segundos
-        self.duracion_max_lluvia = 5   # Duración máxima de lluvia en segundos
+    def programar_cambio():
+        planificador.programar(esperas(), cambiar_clima)
     
-    def run(self):
-        """Simula cambios climáticos aleatorios"""
-        while not self.colmena.event_fin_simulacion.is_set():
-            # Tiempo entre cambios climáticos (10-20 segundos)
-            tiempo_espera = random.uniform(4,8)
-            time.sleep(tiempo_espera)
-            
-            if self.colmena.event_fin_simulacion.is_set():
-                break
-            
-            # Determinar si lloverá
-            lluvia = random.random() < self.probabilidad_lluvia
-            
-            if lluvia:
-                # Cuando llueve, la calidad de las flores disminuye
-                calidad_flores = random.uniform(0.3, 0.7)
-                duracion = random.uniform(
-                    self.duracion_min_lluvia, 
-                    self.duracion_max_lluvia
-                )
-                
-                print(f"[Clima] Comienza a llover. Calidad de flores: {calidad_flores:.2f}")
-                self.colmena.cambiar_clima(True, calidad_flores)
-                
-                time.sleep(duracion)
-                
-                if self.colmena.event_fin_simulacion.is_set():
-                    break
-            
-            # Después de la lluvia o si no llueve, el clima es favorable
-            calidad_flores = random.uniform(0.8, 1.2)
-            print(f"[Clima] Clima favorable. Calidad de flores: {calidad_flores:.2f}")
-            self.colmena.cambiar_clima(False, calidad_flores)
+    def cambiar_clima():
+        """Simula un cambio climático aleatorio"""
+        if sorteos_lluvia() < CLIMA_PROB_LLUVIA:
+            # Cuando llueve, la calidad de las flores disminuye
+            calidad_flores = calidades_lluvia()
+            logger.info("[Clima] Comienza a llover. Calidad de flores: %.2f", calidad_flores)
+            colmena.cambiar_clima(True, calidad_flores)
+            planificador.programar(duraciones_lluvia(), despejar)
+        else:
+            despejar()
+    
+    def despejar():
+        """Después de la lluvia o si no llueve, el clima es favorable"""
+        calidad_flores = calidades_buenas()
+        logger.info("[Clima] Clima favorable. Calidad de flores: %.2f", calidad_flores)
+        colmena.cambiar_clima(False, calidad_flores)
+        programar_cambio()
+    
+    programar_cambio()
 
 
-class EventoAtaque(threading.Thread):
-    """Simula ataques aleatorios a la colmena"""
+def iniciar_ataques(colmena, planificador, tiempo_simulacion):
+    """
+    Simula ataques aleatorios a la colmena
+    Programa el primer posible ataque; cada intento programa el siguiente
+    """
+    # Sorteos por lotes con un generador propio (solo lo usa el hilo de eventos)
+    rng = np.random.default_rng()
+    intervalos = LoteAleatorio(
+        lambda n: rng.uniform(ATAQUE_INTERVALO_MIN, ATAQUE_INTERVALO_MAX, n)).siguiente
+    sorteos_ataque = LoteAleatorio(rng.random).siguiente
+    indices_tipo = LoteAleatorio(
+        lambda n: rng.integers(0, len(ATAQUE_TIPOS), n)).siguiente
+    intensidades = LoteAleatorio(
+        lambda n: rng.uniform(*ATAQUE_INTENSIDAD, n)).siguiente
     
-    def __init__(self, colmena):
-        super().__init__()
-        self.colmena = colmena
-        self.daemon = True
-        
-        # Parámetros de ataques
-        self.probabilidad_base = 0.5  # Probabilidad base de ataque
-        self.intervalo_min = 5      # Tiempo mínimo entre ataques (segundos)
-        self.intervalo_max = 8      # Tiempo máximo entre ataques (segundos)
+    def programar_ataque(espera_extra=0):
+        planificador.programar(max(0, espera_extra + intervalos()), intentar_ataque)
     
-    def run(self):
-        """Genera ataques aleatorios a la colmena"""
-        # Espera inicial para dar tiempo a que la colmena se establezca
-        time.sleep(10)
+    def intentar_ataque():
+        """Genera un ataque aleatorio a la colmena"""
+        # Mayor probabilidad de ataque durante el día
+        probabilidad_actual = ATAQUE_PROB_BASE
+        if colmena.event_dia.is_set():
+            probabilidad_actual *= ATAQUE_FACTOR_DIA
         
-        while not self.colmena.event_fin_simulacion.is_set():
-            # Calcular tiempo hasta el próximo ataque
-            tiempo_espera = random.uniform(self.intervalo_min, self.intervalo_max)
-            time.sleep(tiempo_espera)
-            
-            if self.colmena.event_fin_simulacion.is_set():
-                break
+        if sorteos_ataque() < probabilidad_actual:
+            logger.info("[Ataque] ¡Alerta! Ataque de %s con intensidad %.1f",
+                        ATAQUE_TIPOS[indices_tipo()], intensidades())
             
-            # Mayor probabilidad de ataque durante el día
-            probabilidad_actual = self.probabilidad_base
-            if self.colmena.event_dia.is_set():
-                probabilidad_actual *= 1.5  # 50% más probable durante el día
-            
-            # Verificar si ocurre un ataque
-            if random.random() < probabilidad_actual:
-                # Generar un ataque
-                tipo_ataque = random.choice(["avispa", "pájaro", "oso", "humano"])
-                intensidad = random.uniform(1, 10)
-                
-                print(f"[Ataque] ¡Alerta! Ataque de {tipo_ataque} "
-                      f"con intensidad {intensidad:.1f}")
-                
-                # Registrar el ataque en la colmena
-                self.colmena.registrar_ataque()
-                
-                # Esperar a que el ataque sea neutralizado o un timeout
-                timeout = 5  # Segundos máximos para neutralizar el ataque
-                inicio = time.time()
-                
-                while (self.colmena.event_ataque.is_set() and 
-                       time.time() - inicio < timeout and
-                       not self.colmena.event_fin_simulacion.is_set()):
-                    time.sleep(0.1)
-                
-                if self.colmena.event_ataque.is_set():
-                    # Ataque no neutralizado a tiempo
-                    self.colmena.event_ataque.clear()
-                    print("[Ataque] Ataque no neutralizado a tiempo")
-
-
-class EventoDiaNoche(threading.Thread):
-    """Simula los ciclos de día y noche que afectan al comportamiento de las abejas"""
-    
-    def __init__(self, colmena):
-        super().__init__()
-        self.colmena = colmena
-        self.daemon = True
-        
-        # Parámetros del ciclo día/noche
-        self.duracion_dia = 8    # Duración del día en segundos
-        self.duracion_noche = 4  # Duración de la noche en segundos
+            # Registrar el ataque en la colmena y revisarlo al vencer el plazo
+            colmena.registrar_ataque()
+            planificador.programar(ATAQUE_TIMEOUT, comprobar_ataque)
+        else:
+            programar_ataque()
     
-    def run(self):
-        """Alterna entre ciclos de día y noche"""
-        # Empezamos con el día
-        self.colmena.cambiar_ciclo_dia(True)
-        es_dia = True
-        
-        while not self.colmena.event_fin_simulacion.is_set():
-            # Duración del ciclo actual
-            duracion = self.duracion_dia if es_dia else self.duracion_noche
-            
-            # Esperar por la duración del ciclo actual
-            time.sleep(duracion)
-            
-            if self.colmena.event_fin_simulacion.is_set():
-                break
-            
-            # Cambiar al ciclo opuesto
-            es_dia = not es_dia
-            self.colmena.cambiar_ciclo_dia(es_dia)
-            
-            estado = "día" if es_dia else "noche"
-            print(f"[Ciclo] Cambio a {estado}")
\ No newline at end of file
+    def comprobar_ataque():
+        """Al vencer el plazo, retira el ataque si nadie lo ha neutralizado"""
+        if colmena.ataque_en_curso():
+            # Ataque no neutralizado a tiempo
+            colmena.cancelar_ataque()
+            logger.info("[Ataque] Ataque no neutralizado a tiempo")
+            programar_ataque()
+        else:
+            # El intervalo hasta el siguiente ataque cuenta desde la neutralización
+            programar_ataque(colmena.hora_ultima_neutralizacion - colmena.reloj())
+    
+    # Espera inicial para dar tiempo a que la colmena se establezca
+    programar_ataque(ATAQUE_ESPERA_INICIAL)
+
+
+def calendario_dia_noche(tiempo_simulacion):
+    """
+    Los ciclos son fijos: calcula de una vez los cambios de la simulación
+    Devuelve: lista de (segundos desde el inicio, es_dia)
+    """
+    calendario = []
+    hora, es_dia = 0, True
+    while True:
+        hora += DURACION_DIA if es_dia else DURACION_NOCHE
+        if hora >= tiempo_simulacion:
+            return calendario
+        es_dia = not es_dia
+        calendario.append((hora, es_dia))
+
+
+def iniciar_dia_noche(colmena, planificador, tiempo_simulacion):
+    """Empieza el primer día y programa todos los cambios del calendario"""
+    colmena.cambiar_ciclo_dia(True)
+    for hora, es_dia in calendario_dia_noche(tiempo_simulacion):
+        planificador.programar(hora, lambda es_dia=es_dia: cambiar_ciclo(colmena, es_dia))
+
+
+def cambiar_ciclo(colmena, es_dia):
+    """Pasa al ciclo indicado por el calendario"""
+    colmena.cambiar_ciclo_dia(es_dia)
+    logger.info("[Ciclo] Cambio a %s", "día" if es_dia else "noche")
+
+
+# Tabla de eventos: cada función programa sus primeros eventos en el planificador
+EVENTOS = (iniciar_clima, iniciar_ataques, iniciar_dia_noche)
\ No newline at end of file
@@ -1,13 +1,56 @@
-from colmena import Colmena
-from agentes import Recolectora, Almacenadora, Nodriza, Defensora, Reina
+import argparse
+import logging
+import os
+import shutil
+import subprocess
+import sys
+
+from colmena import Colmena, ESTADO_ERROR
+from agentes import (Recolectora, Almacenadora, Nodriza, Defensora, Reina,
+                     PlanificadorAbejas, ReservaAbejas)
 from eventos import GestorEventos
 from analisis import Analizador
-import time
+
+
+def relanzar_con_pyspy(args):
+    """
+    Relanza la simulación bajo py-spy, muestreando cada hilo (también los que
+    esperan) y guardando la gráfica de llamas en profile.svg
+    Devuelve: False si py-spy no está instalado
+    """
+    if shutil.which("py-spy") is None:
+        print("[Main] py-spy no está instalado; se ejecuta sin perfilar.")
+        return False
+    orden = ["py-spy", "record", "--threads", "--idle", "-o", "profile.svg",
+             "--", sys.executable, os.path.abspath(__file__)]
+    if args.virtual:
+        orden.append("--virtual")
+    if args.verbose:
+        orden.append("--verbose")
+    subprocess.run(orden)
+    return True
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Simulación de una colmena de abejas")
+    parser.add_argument("--virtual", action="store_true",
+                        help="simular en tiempo virtual, en un solo hilo y sin esperas reales")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="mostrar los eventos ambientales (clima, ataques, día/noche)")
+    parser.add_argument("--profile", choices=("none", "pyspy", "scalene"), default="none",
+                        help="perfilar la simulación: pyspy la relanza bajo py-spy "
+                             "(profile.svg); scalene requiere lanzar con 'scalene --off'")
+    args = parser.parse_args()
+
+    if args.profile == "pyspy" and relanzar_con_pyspy(args):
+        return
+
+    # Los eventos solo se registran con --verbose; si no, no se llegan a formatear
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(message)s")
+
     # Duración corta pero simulación intensa
-    duracion_simulacion = 30  # segundos reales
+    duracion_simulacion = 30  # segundos (reales, o virtuales con --virtual)
 
     # Más abejas activas
     abejas_iniciales = {
@@ -17,45 +60,93 @@ def main():
         "defensora": 3
     }
 
+    # Perfilado con scalene de toda la simulación (desde antes de crear las abejas)
+    perfilador = None
+    if args.profile == "scalene":
+        try:
+            from scalene import scalene_profiler
+        except ImportError:
+            print("[Main] scalene no está instalado; se ejecuta sin perfilar.")
+        else:
+            perfilador = scalene_profiler
+            perfilador.start()
+
     # Inicializar colmena
     colmena = Colmena()
     print("[Main] Colmena inicializada.")
 
-    # Crear reina
-    reina = Reina(colmena)
-    reina.start()
-    print("[Main] Reina iniciada.")
+    # Eventos ambientales intensos (en tiempo virtual su planificador lo dirige todo)
+    gestor_eventos = GestorEventos(colmena, tiempo_simulacion=duracion_simulacion,
+                                   virtual=args.virtual)
+    eventos_virtuales = gestor_eventos.planificador if args.virtual else None
 
-    # Crear abejas obreras con tiempos reducidos
-    abejas = []
+    # Planificador que reparte las abejas no bloqueantes entre pocos hilos;
+    # sin GIL (CPython free-threaded, PEP 703) sus hilos corren en paralelo,
+    # así que se usa uno por núcleo
+    gil_activo = getattr(sys, "_is_gil_enabled", lambda: True)()
+    num_hilos = 4 if gil_activo else (os.cpu_count() or 4)
+    if not gil_activo:
+        print(f"[Main] Python sin GIL: {num_hilos} hilos de planificador en paralelo.")
+    planificador = PlanificadorAbejas(colmena, num_hilos=num_hilos,
+                                      eventos=eventos_virtuales)
+    planificador.iniciar()
+
+    # Reserva que reutiliza las abejas muertas del planificador
     fabrica = {
         "recolectora": Recolectora,
         "almacenadora": Almacenadora,
         "nodriza": Nodriza,
         "defensora": Defensora
     }
+    reserva = ReservaAbejas(colmena, fabrica)
+
+    # Crear reina
+    reina = Reina(colmena, planificador=planificador, reserva=reserva)
+    if args.virtual:
+        planificador.agregar(reina)
+    else:
+        reina.start()
+    print("[Main] Reina iniciada.")
 
+    # Crear abejas obreras con tiempos reducidos
+    abejas = []
     for rol, cantidad in abejas_iniciales.items():
         for _ in range(cantidad):
-            abeja = fabrica[rol](colmena, tiempo_vida=20, tiempo_trabajo=0.1)
-            abeja.start()
+            abeja = reserva.adquirir(rol, tiempo_vida=20, tiempo_trabajo=0.1)
+            reina.lanzar_abeja(abeja)
             abejas.append(abeja)
-            reina.agregar_abeja(abeja)
 
     print(f"[Main] {sum(abejas_iniciales.values())} abejas lanzadas.")
 
-    # Iniciar eventos ambientales intensos
-    gestor_eventos = GestorEventos(colmena, tiempo_simulacion=duracion_simulacion)
-    gestor_eventos.start()
-
     # Iniciar análisis frecuente
     analizador = Analizador(colmena, intervalo=2)
-    analizador.iniciar()
+    analizador.iniciar(planificador=eventos_virtuales)
+
+    if args.virtual:
+        # Toda la simulación transcurre aquí, sin hilos ni esperas
+        gestor_eventos.run()
+    else:
+        gestor_eventos.start()
+        try:
+            # Esperar a que termine (con un margen por si el gestor no llegara a cerrar)
+            if colmena.esperar_fin_simulacion(timeout=duracion_simulacion + 5) is None:
+                print("[Main] El gestor de eventos no cerró la simulación a tiempo.")
+                colmena.finalizar_simulacion(ESTADO_ERROR)
+        finally:
+            # Cierre ordenado, también con Ctrl-C: al terminar la simulación
+            # (si no había terminado ya) cada hilo sale por su cuenta
+            colmena.finalizar_simulacion(ESTADO_ERROR)
+            gestor_eventos.join(timeout=2)
+            reina.join(timeout=2)
+            reina.esperar_abejas(timeout=1)
+            planificador.esperar(timeout=2)
+            analizador.esperar(timeout=2)
 
-    # Esperar a que termine
-    while not colmena.event_fin_simulacion.is_set():
-        time.sleep(1)
+    if perfilador:
+        perfilador.stop()
 
+    if colmena.estado_simulacion == ESTADO_ERROR:
+        print("[Main] La simulación se detuvo por un error.")
     print("[Main] Simulación finalizada. Generando informe...")
     analizador.imprimir_informe()
     analizador.guardar_informe()